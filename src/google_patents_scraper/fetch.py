@@ -1,75 +1,154 @@
-import json
 import time
+from abc import ABC, abstractmethod
 from logging import getLogger
+from typing import TypeVar
 
+import httpx
+import orjson
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
 logger = getLogger(__name__)
 
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+"""User-Agent header sent with plain HTTP requests."""
 
-def fetch_html(url: str) -> str:
-    """Fetch the source HTML of the given URL."""
+FetcherT = TypeVar("FetcherT", bound="Fetcher")
+
+
+class Fetcher(ABC):
+    """Fetches the source HTML of URLs.
+
+    Use as a context manager to ensure any resources are released afterwards.
+    """
+
+    def __enter__(self: FetcherT) -> FetcherT:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release any resources held by the fetcher."""
+
+    @abstractmethod
+    def fetch_html(self, url: str) -> str:
+        """Fetch the source HTML of the given URL."""
+
+
+class HttpFetcher(Fetcher):
+    """Fetches the source HTML of URLs with plain HTTP requests.
+
+    Google Patents pages are rendered on the server, so the response body is the
+    same HTML that Chrome shows with "view-source:", without the cost of
+    starting and driving a browser.
+    """
+
+    def __init__(self) -> None:
+        self.client = httpx.Client(
+            http2=True, follow_redirects=True, headers={"User-Agent": USER_AGENT}
+        )
+
+    def close(self) -> None:
+        self.client.close()
+
+    def fetch_html(self, url: str) -> str:
+        response = self.client.get(url)
+        response.raise_for_status()
+        return response.text
 
-    # Client requires that we use content that is exactly identical to a human
-    # using "view-source:" as a prefix on a URL in Chrome.
-    #
-    # We can't use the straightforward WebDriver.page_source property, as this
-    # returns the _rendered_ HTML of the page (e.g. this would include all the
-    # syntax highlighting and whitespace transformations performed by the
-    # browser for pretty-printing). A file created by a human using "Save As" on
-    # the view-source: page would produce the correct result. At the time of
-    # writing it did not seem possible to cleanly automate that process without
-    # using experimental Chrome features, as Selenium doesn't have the ability
-    # to interact with the native file dialog.
-    #
-    # Instead, we intercept the network response by enabling performance logging
-    # and using the Chrome Developer Protocol to extract the logged response:
-    # https://stackoverflow.com/a/77065745
-    options = Options()
-    options.add_argument("headless")
-    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
-
-    driver = webdriver.Chrome(options=options)
-    driver.get(f"view-source:{url}")
-
-    # Wait for page to finish loading
-    timeout = 5.0
-    start_time = time.time()
-    while driver.execute_script("return document.readyState") != "complete":  # type: ignore
-        elapsed = time.time() - start_time
-        if elapsed >= timeout:
-            raise TimeoutError(f"Page did not load within {timeout} seconds.")
-        logger.debug(f"Waiting for page to load, elapsed time: {elapsed}")
-        time.sleep(0.25)
-    logger.info("Page load complete.")
-
-    request_id = ""
-    # Find message containing the full response, which happens in the
-    # loadingFinished event. We use that message to lookup the request ID for
-    # our target response.
-    for entry in driver.get_log("performance"):  # type: ignore
-        message = json.loads(entry["message"])["message"]
-        if message["method"] == "Network.loadingFinished":
-            request_id = message["params"]["requestId"]
-            break
-
-    if not request_id:
-        raise RuntimeError(
-            "Could not find 'Network.loadingFinished' message in browser logs."
+
+class BrowserFetcher(Fetcher):
+    """Fetches the source HTML of URLs using a single long-lived browser.
+
+    Starting Chrome dominates the time taken to fetch a page, so the same
+    browser is reused for every URL.
+    """
+
+    def __init__(self) -> None:
+        # Client requires that we use content that is exactly identical to a
+        # human using "view-source:" as a prefix on a URL in Chrome.
+        #
+        # We can't use the straightforward WebDriver.page_source property, as
+        # this returns the _rendered_ HTML of the page (e.g. this would include
+        # all the syntax highlighting and whitespace transformations performed
+        # by the browser for pretty-printing). A file created by a human using
+        # "Save As" on the view-source: page would produce the correct result.
+        # At the time of writing it did not seem possible to cleanly automate
+        # that process without using experimental Chrome features, as Selenium
+        # doesn't have the ability to interact with the native file dialog.
+        #
+        # Instead, we intercept the network response by enabling performance
+        # logging and using the Chrome Developer Protocol to extract the logged
+        # response: https://stackoverflow.com/a/77065745
+        options = Options()
+        options.add_argument("headless")
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+        self.driver = webdriver.Chrome(options=options)
+
+    def close(self) -> None:
+        self.driver.quit()
+
+    def fetch_html(self, url: str) -> str:
+        driver = self.driver
+        # Leave the previous page and discard its log entries, so that we only
+        # see the responses for this URL.
+        driver.get("about:blank")
+        driver.get_log("performance")  # type: ignore
+
+        driver.get(f"view-source:{url}")
+
+        # Wait for page to finish loading
+        timeout = 5.0
+        start_time = time.time()
+        while driver.execute_script("return document.readyState") != "complete":  # type: ignore
+            elapsed = time.time() - start_time
+            if elapsed >= timeout:
+                raise TimeoutError(f"Page did not load within {timeout} seconds.")
+            logger.debug(f"Waiting for page to load, elapsed time: {elapsed}")
+            time.sleep(0.25)
+        logger.info("Page load complete.")
+
+        request_id = ""
+        # Find message containing the full response, which happens in the
+        # loadingFinished event. We use that message to lookup the request ID for
+        # our target response. Most entries are for other events, so skip them
+        # without decoding.
+        for entry in driver.get_log("performance"):  # type: ignore
+            if '"Network.loadingFinished"' not in entry["message"]:
+                continue
+            message = orjson.loads(entry["message"])["message"]
+            if message["method"] == "Network.loadingFinished":
+                request_id = message["params"]["requestId"]
+                break
+
+        if not request_id:
+            raise RuntimeError(
+                "Could not find 'Network.loadingFinished' message in browser logs."
+            )
+        # Fetch the response body:
+        # https://chromedevtools.github.io/devtools-protocol/tot/Network/#method-getResponseBody
+        response = driver.execute_cdp_cmd(
+            "Network.getResponseBody", {"requestId": request_id}
         )
-    # Fetch the response body:
-    # https://chromedevtools.github.io/devtools-protocol/tot/Network/#method-getResponseBody
-    response = driver.execute_cdp_cmd(
-        "Network.getResponseBody", {"requestId": request_id}
-    )
-    if response["base64Encoded"]:
-        # We raise an error because the documentation doesn't specify what kind
-        # of base64 is used, and we haven't encountered this situation yet in
-        # our manual tests.
-        raise NotImplementedError("Encountered base64-encoded content.")
-
-    body = response["body"]
-    assert isinstance(body, str)
-
-    return body
+        if response["base64Encoded"]:
+            # We raise an error because the documentation doesn't specify what kind
+            # of base64 is used, and we haven't encountered this situation yet in
+            # our manual tests.
+            raise NotImplementedError("Encountered base64-encoded content.")
+
+        body = response["body"]
+        assert isinstance(body, str)
+
+        return body
+
+
+def fetch_html(url: str) -> str:
+    """Fetch the source HTML of the given URL."""
+    with HttpFetcher() as fetcher:
+        return fetcher.fetch_html(url)
@@ -1,12 +1,13 @@
-import json
 import logging
+import sys
 from argparse import ArgumentParser
 
+import orjson
 import rich
-from bs4 import Tag
 from rich import traceback
 from rich.logging import RichHandler
 
+from .fetch import BrowserFetcher, Fetcher, HttpFetcher
 from .scrape import scrape
 
 
@@ -14,9 +15,6 @@ def main() -> None:
     rich.reconfigure(stderr=True)
     log_handler = RichHandler(rich_tracebacks=True)
     traceback.install(show_locals=True)
-    # Monkeypatch BS4 Tag to not take huge amounts of screen space in
-    # rich tracebacks.
-    setattr(Tag, "__repr__", lambda s: str(type(s)))
 
     file_handler = logging.FileHandler("log.txt", mode="w")
     logging.basicConfig(
@@ -36,13 +34,25 @@ def main() -> None:
         type=str,
         help=("The Google Patent ID to fetch data for. "),
     )
+    parser.add_argument(
+        "--use-browser",
+        action="store_true",
+        help=(
+            "Fetch pages using headless Chrome instead of plain HTTP requests. "
+            "Slower, but useful for pages that require JavaScript."
+        ),
+    )
     args = parser.parse_args()
 
-    scraped = scrape(args.id)
+    fetcher: Fetcher = BrowserFetcher() if args.use_browser else HttpFetcher()
+    with fetcher:
+        scraped = scrape(args.id, fetcher)
     for translation in scraped:
         # Remove raw HTML when outputting JSON
         translation.pop("html")
-    print(json.dumps(scraped, indent=2))
+    # orjson produces UTF-8 bytes directly, so bypass the text layer of stdout.
+    options = orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+    sys.stdout.buffer.write(orjson.dumps(scraped, option=options))
 
 
 if __name__ == "__main__":
@@ -1,31 +1,92 @@
+import sys
 from collections.abc import Iterator
+from functools import lru_cache
 from logging import getLogger
-from typing import Any, TypeAlias
+from typing import Any, TypeAlias, TypeGuard, cast
 
-from bs4 import BeautifulSoup, NavigableString, Tag
+import lxml.html
+from lxml import etree
+from lxml.html import HtmlComment, HtmlElement, HtmlProcessingInstruction
 
 Field: TypeAlias = tuple[str, Any]
 FieldIterator: TypeAlias = Iterator[Field]
 Node: TypeAlias = dict[str, Any]
+HtmlNode: TypeAlias = HtmlElement | HtmlComment | HtmlProcessingInstruction
+"""Anything that can appear as the child of an element."""
 
 logger = getLogger(__name__)
 
 # We define a 'property' as an HTML tag with an 'itemprop' attribute.
 
 
-def tag_string(tag: Tag) -> str:
+def tag_string(tag: HtmlElement) -> str:
     """Human-readable tag information for logging."""
-    return f"{tag.name=} {tag.attrs=} {tag.sourceline=}"
+    return f"{tag.tag=} {dict(tag.attrib)=} {tag.sourceline=}"
 
 
-def has_class(tag: Tag, class_name: str) -> bool:
-    """True if 'class_name' is one of tag's classes"""
-    classes = tag.get("class") or []
-    return class_name in classes
+def is_tag(node: HtmlNode) -> TypeGuard[HtmlElement]:
+    """True if node is an element, rather than a comment or processing
+    instruction."""
+    return isinstance(node.tag, str)
 
 
+def tag_only_string(tag: HtmlElement) -> str | None:
+    """The single string inside this tag, if there is exactly one.
+
+    Equivalent to BeautifulSoup's Tag.string: if the tag's only child is
+    another tag, we descend into that child.
+    """
+    if len(tag) == 0:
+        return tag.text
+    if tag.text or len(tag) > 1:
+        return None
+    child: HtmlNode = tag[0]
+    if child.tail:
+        return None
+    if is_tag(child):
+        return tag_only_string(child)
+    # Comment
+    return child.text
+
+
+def stripped_strings(tag: HtmlElement) -> Iterator[str]:
+    """Iterates through the non-empty whitespace-stripped text within a tag."""
+    for text in tag.itertext():
+        text = text.strip()
+        if text:
+            yield text
+
+
+def tag_text(tag: HtmlElement) -> str:
+    """Concatenation of all whitespace-stripped text within a tag."""
+    return "".join(text.strip() for text in tag.itertext())
+
+
+def xpath_has_class(class_name: str) -> str:
+    """XPath condition that is true if 'class_name' is one of a tag's classes."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def xpath_tags(tag: HtmlElement, xpath: etree.XPath) -> Iterator[HtmlElement]:
+    """Tags matching a compiled XPath expression, evaluated relative to tag."""
+    results = xpath(tag)
+    assert isinstance(results, list)
+    # All of our expressions select elements.
+    yield from cast(list[HtmlElement], results)
+
+
+def find_xpath(tag: HtmlElement, xpath: etree.XPath) -> HtmlElement | None:
+    """First tag matching a compiled XPath expression, evaluated relative to
+    tag."""
+    return next(xpath_tags(tag, xpath), None)
+
+
+@lru_cache(maxsize=512)
 def hyphenated_to_camel(hyphenated: str) -> str:
-    """Convert hyphenated-string to camelCased string."""
+    """Convert hyphenated-string to camelCased string.
+
+    Memoized, as the same attribute names appear on many tags.
+    """
     parts = list[str]()
     for i, part in enumerate(hyphenated.split("-")):
         if i != 0:
@@ -34,26 +95,63 @@ def hyphenated_to_camel(hyphenated: str) -> str:
     return "".join(parts)
 
 
+FEED_CHUNK_SIZE = 64 * 1024
+"""Number of characters of HTML fed to the parser at a time."""
+
+
+def find_article(html: str) -> HtmlElement | None:
+    """Parse an HTML document up to the end of its <article> tag.
+
+    The document is fed to lxml incrementally, and we stop as soon as the
+    article has been parsed; everything after it (mostly scripts) is never
+    parsed. The <head> is cleared once parsed, as we never use its contents.
+
+    If articles are nested, the outermost one is returned.
+
+    Slicing the article's markup out of the string before parsing is somewhat
+    faster, as the <head> is then skipped entirely. We let the parser find the
+    article instead, so that markup-like text (e.g. in scripts) can't mislead
+    us.
+    """
+    parser = etree.HTMLPullParser(events=("end",), tag=("head", "article"))
+    parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+
+    def parsed_article() -> HtmlElement | None:
+        for _, tag in parser.read_events():
+            if tag.tag == "article":
+                # The end of a nested article arrives before the end of the
+                # article containing it.
+                if next(tag.iterancestors("article"), None) is None:
+                    return cast(HtmlElement, tag)
+                continue
+            tag.clear()
+        return None
+
+    for start in range(0, len(html), FEED_CHUNK_SIZE):
+        parser.feed(html[start : start + FEED_CHUNK_SIZE])
+        if (article := parsed_article()) is not None:
+            return article
+
+    try:
+        # Closes any tags left open at the end of the document.
+        parser.close()
+    except etree.XMLSyntaxError:
+        # Empty document
+        return None
+    return parsed_article()
+
+
 def parse_html(html: str) -> Node:
     """Parse HTML string"""
-    hack.clear()
-
-    soup = BeautifulSoup(html, features="html.parser")
-    article = soup.find("article")
-    if not isinstance(article, Tag):
+    article = find_article(html)
+    if article is None:
         raise ValueError("Could not find <article> tag. Maybe the URL is wrong?")
 
     data: Node = {}
     parse_properties(article, data)
-
-    hack.clear()
-    # Special sections get incorrectly nested under the "links" property. Remove
-    # these properties to move them to the proper location, and also to
-    # specialize their handling.
-    #
-    # TODO(dhrosa): Figure out how to avoid these nesting under "links". Perhaps
-    # pre-process the HTML to nest the special sections under a new synthethic
-    # property.
+    # The generic pass skips the special sections themselves, but "links" can
+    # still hold plain properties that share their names. Remove these so they
+    # don't shadow the special sections.
     if links := data.get("links"):
         for name in SPECIAL_SECTION_NAMES:
             if name in links:
@@ -64,12 +162,10 @@ def parse_html(html: str) -> Node:
     return data
 
 
-hack = set[int]()
-
 START_TAGS = ("dt", "h2")
 
 
-def parse_properties(tag: Tag, current_node: Node) -> None:  # noqa: C901
+def parse_properties(tag: HtmlElement, current_node: Node) -> None:
     """Recursively parse properties.
 
     We skip over tags that are not related to a property.
@@ -77,11 +173,8 @@ def parse_properties(tag: Tag, current_node: Node) -> None:  # noqa: C901
     <dt> and <h2> tags are used as labels that delineate properties. Nodes
     between these tags relate to the previous label.
     """
-    if id(tag) in hack:
-        return
-    hack.add(id(tag))
     child_node: Node
-    if tag.name in START_TAGS:
+    if tag.tag in START_TAGS:
         # New label found; begin a new nested node
         label = parse_label(tag)
         child_node = {}
@@ -94,11 +187,23 @@ def parse_properties(tag: Tag, current_node: Node) -> None:  # noqa: C901
         # This tag itself is not a property, but its descendants might be
         parse_children_properties(tag, current_node)
         return
-    assert isinstance(property_name, str)
+    # The same property names are used as keys in many nodes, on every page.
+    # Interning them shares one string object between all those keys, and lets
+    # dict lookups succeed on identity.
+    property_name = sys.intern(property_name)
+
+    if is_special_section(tag) and not any(
+        map(is_special_section, tag.iterancestors("section"))
+    ):
+        # Parsed separately by parse_special_sections(). Skipping these here
+        # also avoids them getting incorrectly nested under the "links"
+        # property. Sections nested inside another special section are still
+        # parsed as part of their parent.
+        return
 
     value = property_value(tag)
 
-    if tag.has_attr("repeat"):
+    if "repeat" in tag.attrib:
         # "repeat" attribute indicate list-valued properties
         if property_name not in current_node:
             current_node[property_name] = []
@@ -108,11 +213,11 @@ def parse_properties(tag: Tag, current_node: Node) -> None:  # noqa: C901
         current_node[property_name] = value
 
 
-def property_value(tag: Tag) -> Any:
+def property_value(tag: HtmlElement) -> Any:
     """Parse value of a property tag.
 
     Dependent on the type of tag, the interesting content of the tag"""
-    if tag.has_attr("itemscope"):
+    if "itemscope" in tag.attrib:
         # Nested property
         child_node: Node = {}
         parse_children_properties(tag, child_node)
@@ -127,8 +232,8 @@ def property_value(tag: Tag) -> Any:
         # <img> tags
         return src
     # Otherwise, the text within the node is considered the value
-    text = tag.string
-    if not isinstance(text, str):
+    text = tag_only_string(tag)
+    if text is None:
         #
         logger.warning(
             f"Omitting property value for tag with nested content: {tag_string(tag)}"
@@ -137,21 +242,28 @@ def property_value(tag: Tag) -> Any:
     return text.strip()
 
 
-def attrs_to_fields(tag: Tag) -> FieldIterator:
+def attrs_to_fields(tag: HtmlElement) -> FieldIterator:
     """Convert all HTML attributes of a tag into fields except for 'class'."""
-    for key, value in tag.attrs.items():
+    for key, value in tag.attrib.items():
         if key != "class":
             yield hyphenated_to_camel(key), value
 
 
-def parse_label(tag: Tag) -> str:
+def parse_label(tag: HtmlElement) -> str:
     """Convert a label (e.g. an h2 tag) into camel case."""
-    raw = tag.string
-    if not isinstance(raw, str):
+    raw = tag_only_string(tag)
+    if raw is None:
         logger.warning("Label tag has no string")
         return ""
-    raw = raw.strip()
+    return label_to_camel(raw)
+
+
+@lru_cache(maxsize=512)
+def label_to_camel(raw: str) -> str:
+    """Convert label text into camel case.
 
+    Memoized, as the same handful of labels appear many times on each page.
+    """
     parts = list[str]()
     for i, part in enumerate(raw.split()):
         if not part[0].isalnum():
@@ -163,38 +275,41 @@ def parse_label(tag: Tag) -> str:
     return "".join(parts)
 
 
-def parse_children_properties(tag: Tag, current_node: Node) -> None:
-    """Parse properties from all child tags"""
-    for child in tag.children:
-        if not isinstance(child, Tag):
+def parse_children_properties(tag: HtmlElement, current_node: Node) -> None:
+    """Parse properties from all child tags
+
+    Children following a label are parsed into that label's node, the same as
+    parse_siblings_properties() would, so that each child is only visited once.
+    """
+    node = current_node
+    for child in tag.iterchildren(etree.Element):
+        if child.tag in START_TAGS:
+            # New label found; subsequent children belong to a new nested node
+            node = current_node[parse_label(child)] = {}
             continue
-        parse_properties(child, current_node)
+        parse_properties(child, node)
 
 
-def parse_siblings_properties(tag: Tag, current_node: Node) -> None:
+def parse_siblings_properties(tag: HtmlElement, current_node: Node) -> None:
     """Parse properties from all sibling tags"""
-    for sibling in tag.next_siblings:
-        if not isinstance(sibling, Tag):
-            continue
-        if sibling.name in START_TAGS:
+    for sibling in tag.itersiblings(etree.Element):
+        if sibling.tag in START_TAGS:
             return
         parse_properties(sibling, current_node)
 
 
-def parse_publication_numbers(article: Tag) -> Iterator[str]:
-    start = article.find(attrs={"itemprop": "publicationNumber"})
-    if not isinstance(start, Tag):
+def parse_publication_numbers(article: HtmlElement) -> Iterator[str]:
+    start = article.find(".//*[@itemprop='publicationNumber']")
+    if start is None:
         logger.warning("Could not find publication numbers.")
         return
 
-    for sibling in start.next_siblings:
-        if not isinstance(sibling, Tag):
-            continue
-        if sibling.name in START_TAGS:
+    for sibling in start.itersiblings(etree.Element):
+        if sibling.tag in START_TAGS:
             return
-        if sibling.name != "span":
+        if sibling.tag != "span":
             continue
-        text = sibling.get_text(strip=True)
+        text = tag_text(sibling)
         if text:
             yield text
 
@@ -209,22 +324,29 @@ SPECIAL_SECTION_NAMES = (
 """itemprop value of <section> tags that need specialized handling."""
 
 
-def is_special_section(tag: Tag) -> bool:
+def is_special_section(tag: HtmlElement) -> bool:
     """True if this is a <section> tag that needs specialized handling."""
     return (
-        tag.name == "section"
-        and tag.has_attr("itemscope")
+        tag.tag == "section"
+        and "itemscope" in tag.attrib
         and (tag.get("itemprop") in SPECIAL_SECTION_NAMES)
     )
 
 
-def parse_special_sections(article: Tag, current_node: Node) -> None:
+SPECIAL_SECTIONS_XPATH = etree.XPath(
+    ".//section[@itemscope and ("
+    + " or ".join(f"@itemprop='{name}'" for name in SPECIAL_SECTION_NAMES)
+    + ")]"
+)
+"""Finds the same tags as is_special_section() in a single query."""
+
+
+def parse_special_sections(article: HtmlElement, current_node: Node) -> None:
     """Parse section tags that are also properties.
 
     These tags have special structure that is not represented as properties."""
-    for section in article.find_all(is_special_section):
-        property_name = section["itemprop"]
-        assert isinstance(property_name, str)
+    for section in xpath_tags(article, SPECIAL_SECTIONS_XPATH):
+        property_name = section.get("itemprop", "")
         value: Any
         match property_name:
             case "abstract":
@@ -238,108 +360,135 @@ def parse_special_sections(article: Tag, current_node: Node) -> None:
             case "family":
                 value = dict(parse_family(section))
             case _:
-                logger.warning(f"Unhandled section: {section.attrs=}")
+                logger.warning(f"Unhandled section: {tag_string(section)}")
                 value = None
         current_node[property_name] = value
 
 
-def parse_abstract(section: Tag) -> FieldIterator:
+def parse_abstract(section: HtmlElement) -> FieldIterator:
     """Parse abstract section"""
-    abstract = section.find("abstract")
-    if not isinstance(abstract, Tag):
+    abstract = section.find(".//abstract")
+    if abstract is None:
         return
 
     yield from attrs_to_fields(abstract)
-    yield "text", abstract.get_text(strip=True)
+    yield "text", tag_text(abstract)
 
 
-def parse_description(section: Tag) -> FieldIterator:
-    """Parse description section"""
+DESCRIPTION_XPATH = etree.XPath(
+    f"(.//*[{xpath_has_class('description')} or self::description])[1]"
+)
+"""Finds the tag containing the description text within its section."""
 
-    def is_description(tag: Tag) -> bool:
-        return has_class(tag, "description") or (tag.name == "description")
 
-    description = section.find(is_description)
-    if not isinstance(description, Tag):
+def parse_description(section: HtmlElement) -> FieldIterator:
+    """Parse description section"""
+
+    description = find_xpath(section, DESCRIPTION_XPATH)
+    if description is None:
         return
 
     yield from attrs_to_fields(description)
 
-    yield "lines", list(parse_description_lines(description))
+    yield "lines", parse_description_lines(description)
 
 
-def descendant_navigable_strings(tag: Tag) -> Iterator[NavigableString]:
-    """Iterates through NavigableString descendants of the given tag."""
-    for d in tag.descendants:
-        if isinstance(d, NavigableString):
-            yield d
+def numbered_strings(tag: HtmlElement, num: str) -> Iterator[tuple[str, str]]:
+    """Iterates through the text and comment descendants of the given tag.
 
+    Each string is paired with the "num" attribute of its nearest ancestor.
+    'num' is the value inherited from the ancestors of the given tag.
+    """
+    num = tag.get("num") or num
+    if tag.text:
+        yield tag.text, num
+    child: HtmlNode
+    for child in tag:
+        if is_tag(child):
+            yield from numbered_strings(child, num)
+        elif child.text:
+            # Comment
+            yield child.text, num
+        # The text following an element is attached to that element in lxml,
+        # rather than to the element that contains it.
+        if child.tail:
+            yield child.tail, num
+
+
+def parse_description_lines(description: HtmlElement) -> Node:
+    """Parse individual text elements inside the description section.
+
+    Lines are stored column-wise as parallel "nums" and "texts" lists. Patents
+    can have thousands of lines, and this is much more compact (both in memory
+    and in the JSON output) than a separate object for each line.
+
+    Line numbers are tracked while descending the tree, rather than by searching
+    the ancestors of every line.
+    """
+    num = ""
+    for ancestor in description.iterancestors():
+        if ancestor_num := ancestor.get("num"):
+            num = ancestor_num
+            break
 
-def parse_description_lines(description: Tag) -> Iterator[Node]:
-    """Parse individual text elements inside the description section."""
-
-    def get_line_num(s: NavigableString) -> str:
-        """Fetches the "num" attribute of the nearest ancestor."""
-        for parent in s.parents:
-            if num := parent.get("num"):
-                assert isinstance(num, str)
-                return num
-        return ""
-
-    for d in descendant_navigable_strings(description):
-        text = str(d).strip()
+    nums = list[str]()
+    texts = list[str]()
+    for s, line_num in numbered_strings(description, num):
+        text = s.strip()
         if not text:
             continue
-        yield {"num": get_line_num(d), "text": text}
+        nums.append(line_num)
+        texts.append(text)
+    return {"nums": nums, "texts": texts}
 
 
-def parse_claims(section: Tag) -> FieldIterator:
-    """Parse claims section"""
+CLAIMS_XPATH = etree.XPath(f"(.//*[{xpath_has_class('claims')} or self::claims])[1]")
+"""Finds the tag containing all claims within the claims section."""
+
+CLAIM_XPATH = etree.XPath(f".//*[({xpath_has_class('claim')} or self::claim) and @num]")
+"""Finds the individual claims within the tag containing all claims."""
 
-    def is_claims(tag: Tag) -> bool:
-        return has_class(tag, "claims") or tag.name == "claims"
 
-    claims_tag = section.find(is_claims)
-    if not isinstance(claims_tag, Tag):
+def parse_claims(section: HtmlElement) -> FieldIterator:
+    """Parse claims section"""
+
+    claims_tag = find_xpath(section, CLAIMS_XPATH)
+    if claims_tag is None:
         return
 
     yield from attrs_to_fields(claims_tag)
 
     parsed_claims = list[Node]()
 
-    def is_claim(tag: Tag) -> bool:
-        return (has_class(tag, "claim") or tag.name == "claim") and tag.has_attr("num")
-
-    for claim in claims_tag.find_all(is_claim):
-        assert isinstance(claim, Tag)
+    for claim in xpath_tags(claims_tag, CLAIM_XPATH):
         parsed_claims.append(dict(parse_claim(claim)))
 
     yield "claims", parsed_claims
 
 
-def parse_claim(claim: Tag) -> FieldIterator:
+def parse_claim(claim: HtmlElement) -> FieldIterator:
     """Parse a single claim"""
     yield from attrs_to_fields(claim)
-    yield "text", list(claim.stripped_strings)
+    yield "text", list(stripped_strings(claim))
 
 
-def parse_application(application: Tag) -> FieldIterator:
+def parse_application(application: HtmlElement) -> FieldIterator:
     """Parse application section."""
     node: Node = {}
     parse_children_properties(application, node)
     yield from node.items()
 
 
-def parse_family(family: Tag) -> FieldIterator:
+def parse_family(family: HtmlElement) -> FieldIterator:
     """Parse family section."""
     # The ID of the family is contained in its first h2 tag.
-    id_tag = family.find("h2")
-    if not isinstance(id_tag, Tag):
+    id_tag = family.find(".//h2")
+    if id_tag is None:
         return
-    yield "id", id_tag.get_text(strip=True).split("=")[-1]
+    yield "id", tag_text(id_tag).split("=")[-1]
 
-    content_start = id_tag.find_next_sibling("h2")
-    if not isinstance(content_start, Tag):
+    content_start = next(id_tag.itersiblings("h2"), None)
+    if content_start is None:
         return
 
     node: Node = {}
@@ -1,6 +1,6 @@
 from logging import getLogger
 
-from .fetch import fetch_html
+from .fetch import Fetcher, HttpFetcher
 from .parse import Node, parse_html
 
 logger = getLogger(__name__)
@@ -11,15 +11,22 @@ def patent_url(patent_id: str, language: str) -> str:
     return f"https://patents.google.com/patent/{patent_id}/{language}"
 
 
-def scrape(patent_id: str) -> list[Node]:
+def scrape(patent_id: str, fetcher: Fetcher | None = None) -> list[Node]:
     """Scrape information for the given patent ID.
 
     We produce one element for every language the patent is available in.
+
+    Pass in a fetcher when scraping many patents to reuse it for all of them.
+    Otherwise a new HttpFetcher is used for this patent.
     """
+    if fetcher is None:
+        with HttpFetcher() as fetcher:
+            return scrape(patent_id, fetcher)
+
     original_url = patent_url(patent_id, "")
     logger.info(f"Parsing patent in its original language: {original_url}")
     # Fetch patent HTML for the original language.
-    original_html = fetch_html(original_url)
+    original_html = fetcher.fetch_html(original_url)
     original = parse_html(original_html)
     try:
         original_language = original["abstract"]["lang"].lower()
@@ -43,7 +50,7 @@ def scrape(patent_id: str) -> list[Node]:
     for language in other_languages:
         url = patent_url(patent_id, language)
         logger.info(f"Fetching {language!r} translation: {url}")
-        html = fetch_html(url)
+        html = fetcher.fetch_html(url)
         parsed.append({"language": language, "data": parse_html(html), "html": html})
 
     logger.info("Scrape completed.")